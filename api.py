@@ -1,6 +1,6 @@
 
 import flask, json, random
-from py3dbp import Packer, Bin, Item
+from py3dbp import Packer, Bin, Item, Placement
 from flask_cors import cross_origin
 
 # init flask
@@ -60,26 +60,11 @@ def mkResultAPI():
             try :
                 # calculate packing
                 packer.pack(bigger_first=True,distribute_items=False,fix_point=True,binding=binding,
-                number_of_decimals=0)
+                number_of_decimals=0,time_budget_s=q.get('timeBudget'))
                 box = packer.bins[0]
-                # make box dict
-                box_r = makeDictBox(box)
-                # make item dict
-                fitItem,unfitItem = [],[]
-                for item in box.items:
-                    fitItem.append(makeDictItem(item))
-                
-                for item in box.unfitted_items:
-                    unfitItem.append(makeDictItem(item))
-
-                # for unfitem in box
-                # make response
                 res["Success"] = True
-                res["data"] = {
-                    "box" : box_r,
-                    "fitItem" : fitItem,
-                    "unfitItem": unfitItem
-                }
+                res["data"] = makeDictResult(box)
+                res["data"]["truncated"] = packer.truncated
                 # print(len(res["data"]["unfitItem"]))
                 return res
             except Exception as e:
@@ -93,6 +78,78 @@ def mkResultAPI():
         return res
 
 
+# select the smallest box holding all items
+@app.route("/selectBox", methods=["POST"])
+@cross_origin()
+def selectBoxAPI():
+    '''
+    '''
+    res = {"Success": False}
+    if flask.request.method == "POST":
+        # the body is data , parse it as json only
+        try :
+            q = json.loads(flask.request.data)
+        except ValueError :
+            res["Reason"] = "input data err"
+            return res
+        if isinstance(q, dict) and 'box' in q.keys() and 'item' in q.keys() and 'binding' in q.keys():
+            try :
+                packer,box,binding = getBoxAndItem(q)
+                boxes = [makeBin(i) for i in q["box"]]
+            except :
+                res["Reason"] = "input data err"
+                return res
+            try :
+                # pack into the candidate boxes from the smallest one
+                box = packer.selectBin(boxes,bigger_first=True,fix_point=True,binding=binding,
+                number_of_decimals=0,time_budget_s=q.get('timeBudget'))
+            except Exception :
+                res['Reason'] = 'cal packing err'
+                return res
+            if box is None:
+                if packer.truncated:
+                    res['Reason'] = 'packing truncated by timeBudget'
+                    res['truncated'] = True
+                else:
+                    res['Reason'] = 'no box can hold all items'
+                return res
+            res["Success"] = True
+            res["data"] = makeDictResult(box)
+            return res
+        else :
+            res['Reason'] = 'box or item not in input data'
+            return res
+    else :
+        res['Reason'] = 'method not POST'
+        return res
+
+
+def makeDictResult(box):
+    ''' box , fitted items and unfitted items of a packed box '''
+    # make box dict
+    box_r = makeDictBox(box)
+    # make item dict
+    # units of one item share it , number them here (corners are not units)
+    fitItem,unfitItem = [],[]
+    unit_no = {}
+    for item in box.items:
+        if not isinstance(item, Placement):
+            fitItem.append(makeDictItem(item))
+            continue
+        unit_no[item.name] = unit_no.get(item.name, 0) + 1
+        fitItem.append(makeDictItem(item, unit_no[item.name]))
+
+    for item in box.unfitted_items:
+        unit_no[item.name] = unit_no.get(item.name, 0) + 1
+        unfitItem.append(makeDictItem(item, unit_no[item.name]))
+
+    return {
+        "box" : box_r,
+        "fitItem" : fitItem,
+        "unfitItem": unfitItem
+    }
+
+
 def makeDictBox(box):
     position = (int(box.width)/2,int(box.height)/2,int(box.depth)/2)
     r = {
@@ -100,12 +157,14 @@ def makeDictBox(box):
             "position" : position,
             "WHD" : (int(box.width),int(box.height),int(box.depth)),
             "weight" : int(box.max_weight),
-            "gravity" : box.gravity
+            "gravity" : box.gravity,
+            "totalWeight" : float(box.total_weight),
+            "fillRate" : round(box.fill_rate * 100, 2)
         }
     return [r]
 
 
-def makeDictItem(item):
+def makeDictItem(item, no=None):
     ''' '''
 
     if item.rotation_type == 0:
@@ -128,7 +187,7 @@ def makeDictItem(item):
         whd = (int(item.width),int(item.depth),int(item.height))
     
     r = {
-        "partNumber" : item.partno,
+        "partNumber" : item.partno if no is None else item.partno + '-{}'.format(str(no)),
         "name" : item.name,
         "type" : item.typeof,
         "color" : item.color,
@@ -146,14 +205,7 @@ def getBoxAndItem(data):
     # init packer
     packer = Packer()
     # get bin data
-    box_data = data["box"][0]
-    box = Bin(
-        partno=box_data['name'],
-        WHD=box_data['WHD'],
-        max_weight=box_data['weight'],
-        corner=box_data['coner'],
-        put_type=box_data['openTop'][0]
-        )
+    box = makeBin(data["box"][0])
     packer.addBin(box)
     # get item data  TODO
     item_data = data["item"]
@@ -167,9 +219,8 @@ def getBoxAndItem(data):
         7:'orange'
     }
     for i in item_data :
-        for j in range(i['count']) :
-            packer.addItem(Item(
-            partno = i['name']+'-{}'.format(str(j+1)),
+        packer.addItems(Item(
+            partno = i['name'],
             name = i['name'],
             typeof = 'cylinder' if i['type'] == 2 else 'cube',
             WHD = i['WHD'], 
@@ -177,7 +228,8 @@ def getBoxAndItem(data):
             level = 1 if i['level'] == 1 else 2,
             loadbear = i['loadbear'],
             updown = bool(i['updown']),
-            color = randColor(i['color']))
+            color = randColor(i['color'])),
+            i['count']
         )
     binding_data = data['binding']
     binding = []
@@ -188,6 +240,17 @@ def getBoxAndItem(data):
     return packer,box,binding
 
 
+def makeBin(box_data):
+    ''' '''
+    return Bin(
+        partno=box_data['name'],
+        WHD=box_data['WHD'],
+        max_weight=box_data['weight'],
+        corner=box_data['coner'],
+        put_type=box_data['openTop'][0]
+        )
+
+
 def randColor(s):
     ''' '''
     random.seed(s)
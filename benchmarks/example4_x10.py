@@ -0,0 +1,108 @@
+from py3dbp import Packer, Bin, Item
+import time
+import tracemalloc
+
+'''
+
+Compare the slotted Item / Bin with dict-backed objects on the example4 workload scaled up 10x ,
+packed in a fleet of BINS example4 containers.
+Run from the repository root : python -m benchmarks.example4_x10
+
+'''
+
+SCALE = 10
+# containers in the fleet , enough for the SCALE times load
+BINS = 2 * SCALE
+
+# example4 cartons : (name, WHD, weight, count)
+CARTONS = [
+    ('Dyson', (170, 82, 46), 85.12, 15),
+    ('wash', (85, 60, 60), 10, 18),
+    ('cabint', (60, 80, 200), 80, 15),
+    ('server', (70, 100, 30), 20, 42),
+]
+
+
+def withoutSlots(cls):
+    ''' independent class with the methods of cls keeping its attributes in a __dict__ , as before __slots__ '''
+    slots = set(cls.__slots__)
+    body = {name: value for name, value in vars(cls).items() if name != '__slots__' and name not in slots}
+    body['__module__'] = __name__
+    return type('Dict' + cls.__name__, (), body)
+
+
+DictItem = withoutSlots(Item)
+DictBin = withoutSlots(Bin)
+
+
+def makeItems(item_class):
+    ''' example4 cartons, SCALE times the count '''
+    items = []
+    for name, WHD, weight, count in CARTONS:
+        for i in range(count * SCALE):
+            items.append(item_class(
+                partno='{}{}'.format(name, i + 1),
+                name=name,
+                typeof='cube',
+                WHD=WHD,
+                weight=weight,
+                level=1,
+                loadbear=100,
+                updown=True,
+                color='#FF0000')
+            )
+    return items
+
+
+def itemMemory(item_class):
+    ''' bytes allocated per item '''
+    tracemalloc.start()
+    items = makeItems(item_class)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / len(items)
+
+
+def lookupTime(items, repeat=20):
+    ''' time of getDimension on every rotation of every item '''
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            for rt in range(6):
+                item.rotation_type = rt
+                item.getDimension()
+    return time.perf_counter() - start
+
+
+def packTime(item_class, bin_class):
+    ''' time of packing the workload in BINS example4 containers '''
+    packer = Packer()
+    for i in range(BINS):
+        packer.addBin(bin_class(
+            partno='example4-{}'.format(i + 1),
+            WHD=(589.8, 243.8, 259.1),
+            max_weight=28080,
+            corner=15,
+            put_type=0
+        ))
+    for item in makeItems(item_class):
+        packer.addItem(item)
+    start = time.perf_counter()
+    packer.pack(
+        bigger_first=True,
+        distribute_items=True,
+        fix_point=True,
+        check_stable=True,
+        support_surface_ratio=0.75,
+        number_of_decimals=0
+    )
+    return time.perf_counter() - start, sum(bin.item_count for bin in packer.bins)
+
+
+if __name__ == '__main__':
+    print('items : ', sum(c[3] for c in CARTONS) * SCALE)
+    for label, item_class, bin_class in (('slots', Item, Bin), ('dict', DictItem, DictBin)):
+        items = makeItems(item_class)
+        used, fitted = packTime(item_class, bin_class)
+        print('{:<6} bytes/item : {:7.1f}  getDimension : {:.3f}s  pack : {:.2f}s ({} fitted)'.format(
+            label, itemMemory(item_class), lookupTime(items), used, fitted))
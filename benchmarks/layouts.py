@@ -0,0 +1,116 @@
+from py3dbp import Packer, Bin, Item
+from .suite import PACK_KWARGS, example4, alldata
+import argparse
+import json
+import os
+import random
+import sys
+
+'''
+
+Layout fixture : the placements of a set of packing scenarios , stored in benchmarks/layouts.json ,
+to check that a change meant to be a pure optimization keeps every layout.
+Run from the repository root :
+
+    python -m benchmarks.layouts                     # compare with benchmarks/layouts.json
+    python -m benchmarks.layouts --save              # store the layouts as the new fixture
+    python -m benchmarks.layouts rand_dist binding   # only some scenarios
+
+Exits with 1 when a scenario gives another layout.
+
+'''
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE = os.path.join(HERE, 'layouts.json')
+
+
+def randomPacker(seed, count, WHD=(30, 20, 25), decimals=False, bins=1, corner=0):
+    ''' count random items (cubes and cylinders , some with decimal edges) and bins a bit different from WHD '''
+    r = random.Random(seed)
+    packer = Packer()
+    for k in range(bins):
+        packer.addBin(Bin('bin{}'.format(k), (WHD[0] - k, WHD[1], WHD[2] + k), 500, corner, 1))
+    for i in range(count):
+        packer.addItem(Item(
+            partno='item{}'.format(i),
+            name='sku{}'.format(i % 4),
+            typeof=r.choice(['cube', 'cube', 'cylinder']),
+            WHD=tuple(r.randint(1, 9) + (r.choice([0, 0.5, 0.25]) if decimals else 0) for _ in range(3)),
+            weight=r.randint(1, 20),
+            level=r.randint(1, 3),
+            loadbear=r.choice([50, 100]),
+            updown=r.choice([True, False]),
+            color='red')
+        )
+    return packer, {}
+
+
+def scenario(make, **kwargs):
+    ''' builder of the packer and the pack kwargs , kwargs override the ones of make '''
+    def build():
+        packer, extra = make()
+        return packer, dict(extra, **kwargs)
+    return build
+
+
+SCENARIOS = {
+    'example4': scenario(example4, **PACK_KWARGS),
+    'alldata': scenario(lambda: alldata(1), **PACK_KWARGS),
+    'binding': scenario(lambda: alldata(1, binding=[('AEHHXV060005YH10', 'AEEAGD060040FH011')]), **PACK_KWARGS),
+    'rand_stable': scenario(lambda: randomPacker(0, 40, WHD=(18, 14, 15)), bigger_first=True, distribute_items=False),
+    'rand_nofix': scenario(lambda: randomPacker(1, 40, WHD=(18, 14, 15)), bigger_first=True, distribute_items=False, fix_point=False, check_stable=False),
+    'rand_dec1': scenario(lambda: randomPacker(7, 40, decimals=True), bigger_first=True, distribute_items=False, number_of_decimals=1),
+    'rand_dec2': scenario(lambda: randomPacker(8, 40, decimals=True), bigger_first=True, distribute_items=False, number_of_decimals=2),
+    'rand_dist': scenario(lambda: randomPacker(9, 150, WHD=(20, 15, 15), bins=3), bigger_first=True, distribute_items=True),
+    'rand_nodist': scenario(lambda: randomPacker(10, 60, bins=3), distribute_items=False),
+    'rand_corner': scenario(lambda: randomPacker(11, 50, WHD=(40, 30, 30), corner=2), bigger_first=True, distribute_items=False),
+    'rand_bind': scenario(lambda: randomPacker(12, 50), bigger_first=True, distribute_items=False, binding=[('sku0', 'sku1'), ('sku2',)]),
+}
+
+
+def layout(build):
+    ''' placements , unfitted items and gravity of every bin , then the unfitted items of the packer '''
+    packer, kwargs = build()
+    packer.pack(**kwargs)
+    bins = [{
+        'bin': bin.partno,
+        'items': [[item.partno, [str(float(i)) for i in item.position], item.rotation_type] for item in bin.items],
+        'unfit': [item.partno for item in bin.unfitted_items],
+        'gravity': [round(float(i), 6) for i in bin.gravity],
+    } for bin in packer.bins]
+    return {'bins': bins, 'unfit': [item.partno for item in packer.unfit_items]}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='py3dbp layout fixture')
+    parser.add_argument('scenarios', nargs='*', help='scenarios to run (default all) : ' + ', '.join(SCENARIOS))
+    parser.add_argument('--fixture', default=FIXTURE, help='fixture json file')
+    parser.add_argument('--save', action='store_true', help='store the layouts as the fixture')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error('unknown scenarios : ' + ', '.join(unknown))
+    layouts = {name: layout(SCENARIOS[name]) for name in args.scenarios or SCENARIOS}
+
+    if args.save:
+        stored = {}
+        if args.scenarios and os.path.exists(args.fixture):
+            with open(args.fixture, encoding='utf-8') as f:
+                stored = json.load(f)
+        stored.update(layouts)
+        # one scenario per line , so a diff of the fixture shows the scenarios that changed
+        with open(args.fixture, 'w', encoding='utf-8') as f:
+            f.write('{\n' + ',\n'.join(
+                '{}: {}'.format(json.dumps(name), json.dumps(r, ensure_ascii=False)) for name, r in stored.items()
+            ) + '\n}\n')
+        print('layouts saved to', args.fixture)
+        sys.exit(0)
+
+    with open(args.fixture, encoding='utf-8') as f:
+        stored = json.load(f)
+    changed = [name for name, r in layouts.items() if stored.get(name) != r]
+    for name in layouts:
+        print('{:<16} {}'.format(name, 'CHANGED' if name in changed else 'ok'))
+    print('{} changed layout(s)'.format(len(changed)))
+    sys.exit(1 if changed else 0)
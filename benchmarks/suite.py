@@ -0,0 +1,190 @@
+from py3dbp import Packer, Bin, Item
+from .example4_x10 import CARTONS
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+'''
+
+Benchmark suite of the main packing workloads , time (best of repeats) , peak memory and fill rate per case.
+Run from the repository root :
+
+    python -m benchmarks.suite                       # run and compare with benchmarks/baseline.json
+    python -m benchmarks.suite --save                # run and store the results as the new baseline
+    python -m benchmarks.suite alldata_1x binding    # only some cases (with --save , the other cases stay stored)
+
+Exits with 1 when a case is slower or uses more memory than tolerance * baseline , or fills less.
+
+'''
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, 'baseline.json')
+ALLDATA = os.path.join(HERE, '..', 'allData.json')
+PACK_KWARGS = dict(
+    bigger_first=True,
+    distribute_items=False,
+    fix_point=True,
+    check_stable=True,
+    support_surface_ratio=0.75,
+    number_of_decimals=0
+)
+
+
+def example4():
+    ''' example4 mixed cartons in a 20ft container '''
+    packer = Packer()
+    packer.addBin(Bin('example4', (589.8, 243.8, 259.1), 28080, 15, 0))
+    for name, WHD, weight, count in CARTONS:
+        packer.addItems(Item(name, name, 'cube', WHD, weight, 1, 100, True, 'red'), count)
+    return packer, {}
+
+
+def alldata(scale, binding=(), bins=1):
+    ''' allData.json SKUs , count times scale , in bins of its first container (items distributed over them) '''
+    with open(ALLDATA, encoding='utf-8') as f:
+        data = json.load(f)
+    box = data['box'][0]
+    packer = Packer()
+    for i in range(bins):
+        packer.addBin(Bin('{}-{}'.format(box['name'], i + 1), box['WHD'], box['weight'], box['coner'], box['openTop'][0]))
+    for i in data['item']:
+        packer.addItems(Item(
+            partno=i['name'],
+            name=i['name'],
+            typeof='cylinder' if i['type'] == 2 else 'cube',
+            WHD=i['WHD'],
+            weight=i['weight'],
+            level=1 if i['level'] == 1 else 2,
+            loadbear=i['loadbear'],
+            updown=bool(i['updown']),
+            color='red'), i['count'] * scale
+        )
+    return packer, {'binding': list(binding), 'distribute_items': bins > 1}
+
+
+def randomItems(seed, count, sizes, typeof='cube', WHD=(100, 100, 100), max_weight=100000):
+    ''' count random distinct items , edges drawn from sizes '''
+    r = random.Random(seed)
+    packer = Packer()
+    packer.addBin(Bin('bin', WHD, max_weight, 0, 1))
+    for i in range(count):
+        packer.addItem(Item(
+            partno='item{}'.format(i),
+            name='sku{}'.format(i % 10),
+            typeof=typeof,
+            WHD=(r.randint(*sizes), r.randint(*sizes), r.randint(*sizes)),
+            weight=r.randint(1, 20),
+            level=1,
+            loadbear=100,
+            updown=r.random() < 0.5,
+            color='red')
+        )
+    return packer, {}
+
+
+CASES = {
+    'example4': example4,
+    'alldata_1x': lambda: alldata(1),
+    # the fleet grows with the load , so time and memory scale with it
+    'alldata_5x': lambda: alldata(5, bins=5),
+    'alldata_20x': lambda: alldata(20, bins=20),
+    'small_boxes': lambda: randomItems(1, 300, (3, 12), WHD=(60, 60, 60)),
+    'large_boxes': lambda: randomItems(2, 30, (30, 60)),
+    'cylinders': lambda: randomItems(3, 300, (5, 20), typeof='cylinder'),
+    'binding': lambda: alldata(1, binding=[('AEHHXV060005YH10', 'AEEAGD060040FH011')]),
+}
+
+
+def runCase(make):
+    ''' pack once , return (seconds , fill rate , fitted items) '''
+    packer, kwargs = make()
+    start = time.perf_counter()
+    packer.pack(**dict(PACK_KWARGS, **kwargs))
+    used = time.perf_counter() - start
+    fill = sum(float(bin.used_volume) for bin in packer.bins) / sum(float(bin.getVolume()) for bin in packer.bins)
+    return used, fill, sum(bin.item_count for bin in packer.bins)
+
+
+def peakMemory(make):
+    ''' peak bytes allocated while building and packing '''
+    tracemalloc.start()
+    packer, kwargs = make()
+    packer.pack(**dict(PACK_KWARGS, **kwargs))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def runSuite(names, repeat):
+    ''' results of the cases in names '''
+    results = {}
+    for name in names:
+        runs = [runCase(CASES[name]) for _ in range(repeat)]
+        results[name] = {
+            'time': min(run[0] for run in runs),
+            'peak_memory': peakMemory(CASES[name]),
+            'fill_rate': round(runs[0][1], 6),
+            'fitted': runs[0][2],
+        }
+        print('{:<12} {:8.3f}s {:10.1f}KiB  fill {:6.2f}%  fitted {}'.format(
+            name, results[name]['time'], results[name]['peak_memory'] / 1024, results[name]['fill_rate'] * 100, results[name]['fitted']))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    ''' regressions of results against baseline '''
+    regressions = []
+    for name, r in results.items():
+        if name not in baseline:
+            continue
+        b = baseline[name]
+        if r['time'] > b['time'] * tolerance:
+            regressions.append('{} time {:.3f}s > {:.3f}s'.format(name, r['time'], b['time']))
+        if r['peak_memory'] > b['peak_memory'] * tolerance:
+            regressions.append('{} peak memory {} > {} bytes'.format(name, r['peak_memory'], b['peak_memory']))
+        if r['fill_rate'] < b['fill_rate'] - 1e-6:
+            regressions.append('{} fill rate {:.4f} < {:.4f}'.format(name, r['fill_rate'], b['fill_rate']))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='py3dbp benchmark suite')
+    parser.add_argument('cases', nargs='*', help='cases to run (default all) : ' + ', '.join(CASES))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case , the best time is kept')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed ratio to the baseline time / memory')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline json file')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error('unknown cases : ' + ', '.join(unknown))
+    results = runSuite(args.cases or list(CASES), args.repeat)
+
+    if args.save:
+        # saving some cases keeps the stored results of the others
+        cases = {}
+        if args.cases and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                cases = json.load(f)['cases']
+        cases.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'cases': cases}, f, indent=2)
+            f.write('\n')
+        print('baseline saved to', args.baseline)
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print('no baseline , run with --save first')
+        sys.exit(0)
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f)['cases'], args.tolerance)
+    for line in regressions:
+        print('REGRESSION', line)
+    print('{} regression(s)'.format(len(regressions)))
+    sys.exit(1 if regressions else 0)
@@ -1 +1,2 @@
-from .main import Packer, Bin, Item, Painter
+from .main import Packer, Bin, Item, Placement, Painter
+from .stats import PackStats
@@ -1,4 +1,6 @@
 from decimal import Decimal
+from functools import lru_cache
+import numpy as np
 from .constants import Axis
 
 
@@ -25,6 +27,48 @@ def intersect(item1, item2):
     )
 
 
+def intersectBoxes(boxes, box):
+    ''' mask of the rows of boxes ([x0,x1,y0,y1,z0,z1] matrix like Bin.fit_items) intersecting box '''
+    return (
+        (boxes[:,0] < box[1]) & (box[0] < boxes[:,1]) &
+        (boxes[:,2] < box[3]) & (box[2] < boxes[:,3]) &
+        (boxes[:,4] < box[5]) & (box[4] < boxes[:,5])
+    )
+
+
+def quadrantWeights(boxes, weights, width, height):
+    ''' weight of boxes ([x0,x1,y0,y1,z0,z1] rows) on each quadrant of the bin floor , split by footprint area ,
+    quadrants are [low x low y , high x low y , low x high y , high x high y] '''
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 6)
+    weights = np.asarray(weights, dtype=float)
+    shares = []
+    for a, half in ((0, width / 2), (1, height / 2)):
+        lo, hi = boxes[:,a*2], boxes[:,a*2+1]
+        size = np.maximum(hi - lo, 1e-12)
+        low = np.clip(np.minimum(hi, half) - lo, 0, None) / size
+        shares.append((low, 1 - low))
+    (x_low, x_high), (y_low, y_high) = shares
+    return np.array([
+        (weights * x_low * y_low).sum(),
+        (weights * x_high * y_low).sum(),
+        (weights * x_low * y_high).sum(),
+        (weights * x_high * y_high).sum(),
+    ])
+
+
+def getBox(item):
+    ''' [x0,x1,y0,y1,z0,z1] of item at its current position and rotation '''
+    d = item.getDimension()
+    p = item.position
+
+    return [
+        float(p[0]), float(p[0] + d[0]),
+        float(p[1]), float(p[1] + d[1]),
+        float(p[2]), float(p[2] + d[2])
+    ]
+
+
+@lru_cache(maxsize=None)
 def getLimitNumberOfDecimals(number_of_decimals):
     return Decimal('1.{}'.format('0' * number_of_decimals))
 
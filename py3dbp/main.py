@@ -1,19 +1,37 @@
 from .constants import RotationType, Axis
-from .auxiliary_methods import intersect, set2Decimal
+from .auxiliary_methods import intersectBoxes, getBox, quadrantWeights, set2Decimal
+from .spatial_index import SpatialGrid, BoxBuffer
+from .support import supportingBoxes, supportArea, verticesSupported
+from .stats import PackStats
 import numpy as np
 # required to plot a representation of Bin and contained items 
 from matplotlib.patches import Rectangle,Circle
 import matplotlib.pyplot as plt
 import mpl_toolkits.mplot3d.art3d as art3d
 from collections import Counter
-import copy
+from contextlib import nullcontext
+import random
+import time
 DEFAULT_NUMBER_OF_DECIMALS = 0
 START_POSITION = [0, 0, 0]
+# sort keys of the items , an int order is the seed of a random shuffle
+ITEM_ORDERS = {
+    'volume': lambda item: item.getVolume(),
+    'area': lambda item: item.getMaxArea(),
+    'edge': lambda item: max(item.width, item.height, item.depth),
+    'weight': lambda item: item.weight,
+}
+DEFAULT_PORTFOLIO = ['volume', 'area', 'edge', 'weight', 0, 1, 2, 3]
 
 
 
 class Item:
 
+    __slots__ = (
+        'partno', 'name', 'typeof', 'width', 'height', 'depth', 'weight', 'level', 'loadbear',
+        'updown', 'color', 'rotation_type', 'position', 'number_of_decimals', 'dimensions'
+    )
+
     def __init__(self, partno,name,typeof, WHD, weight, level, loadbear, updown, color):
         ''' '''
         self.partno = partno
@@ -34,6 +52,13 @@ class Item:
         self.rotation_type = 0
         self.position = START_POSITION
         self.number_of_decimals = DEFAULT_NUMBER_OF_DECIMALS
+        self.updateDimensions()
+
+
+    def updateDimensions(self):
+        ''' dimension of every rotation type, recomputed whenever width / height / depth change '''
+        w, h, d = self.width, self.height, self.depth
+        self.dimensions = ((w, h, d), (h, w, d), (h, d, w), (d, h, w), (d, w, h), (w, d, h))
 
 
     def formatNumbers(self, number_of_decimals):
@@ -43,6 +68,7 @@ class Item:
         self.depth = set2Decimal(self.depth, number_of_decimals)
         self.weight = set2Decimal(self.weight, number_of_decimals)
         self.number_of_decimals = number_of_decimals
+        self.updateDimensions()
 
 
     def string(self):
@@ -67,27 +93,80 @@ class Item:
 
     def getDimension(self):
         ''' rotation type '''
-        if self.rotation_type == RotationType.RT_WHD:
-            dimension = [self.width, self.height, self.depth]
-        elif self.rotation_type == RotationType.RT_HWD:
-            dimension = [self.height, self.width, self.depth]
-        elif self.rotation_type == RotationType.RT_HDW:
-            dimension = [self.height, self.depth, self.width]
-        elif self.rotation_type == RotationType.RT_DHW:
-            dimension = [self.depth, self.height, self.width]
-        elif self.rotation_type == RotationType.RT_DWH:
-            dimension = [self.depth, self.width, self.height]
-        elif self.rotation_type == RotationType.RT_WDH:
-            dimension = [self.width, self.depth, self.height]
-        else:
-            dimension = []
+        return self.getRotationDimension(self.rotation_type)
+
+
+    def getRotationDimension(self, rotation_type):
+        ''' dimension of item under rotation_type '''
+        if rotation_type in RotationType.ALL:
+            return list(self.dimensions[rotation_type])
+        return []
+
+
+    def getSignature(self):
+        ''' everything about the item that decides where it can be put '''
+        return (self.width, self.height, self.depth, self.weight, self.updown)
+
+
+    def getRotations(self):
+        ''' allowed rotation types, only the first of those giving the same dimension '''
+        rotate = RotationType.ALL if self.updown == True else RotationType.Notupdown
+        rotations = []
+        for r in rotate:
+            if all(self.dimensions[r] != self.dimensions[i] for i in rotations):
+                rotations.append(r)
+        return rotations
+
+
+
+class Placement:
+
+    __slots__ = ('item', 'position', 'rotation_type')
+
+    def __init__(self, item, position, rotation_type):
+        ''' an item fitted in a bin : reference to the item, with the position and rotation it was put with '''
+        object.__setattr__(self, 'item', item)
+        object.__setattr__(self, 'position', list(position))
+        object.__setattr__(self, 'rotation_type', rotation_type)
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Placement is immutable")
+
+
+    def __getattr__(self, name):
+        ''' other attributes are read from the item '''
+        if name == 'item' or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.item, name)
+
+
+    def __reduce__(self):
+        return (Placement, (self.item, self.position, self.rotation_type))
+
+
+    def string(self):
+        ''' '''
+        return "%s(%sx%sx%s, weight: %s) pos(%s) rt(%s) vol(%s)" % (
+            self.partno, self.width, self.height, self.depth, self.weight,
+            self.position, self.rotation_type, self.getVolume()
+        )
 
-        return dimension
+
+    def getDimension(self):
+        ''' rotation type '''
+        return self.item.getRotationDimension(self.rotation_type)
 
 
 
 class Bin:
 
+    __slots__ = (
+        'partno', 'width', 'height', 'depth', 'max_weight', 'corner', 'items', 'fit_buffer', 'unfitted_items',
+        'number_of_decimals', 'fix_point', 'check_stable', 'support_surface_ratio', 'put_type', 'gravity',
+        'version', 'unfit_cache', 'stats', '_total_weight', '_used_volume', '_item_count', 'quadrant_weight', 'item_boxes', 'spatial_index', 'extreme_points', 'point_index'
+    )
+
     def __init__(self, partno, WHD, max_weight,corner=0,put_type=1):
         ''' '''
         self.partno = partno
@@ -97,7 +176,26 @@ class Bin:
         self.max_weight = max_weight
         self.corner = corner
         self.items = []
-        self.fit_items = np.array([[0,WHD[0],0,WHD[1],0,0]])
+        # rows of fit_items , float64 until formatNumbers sets the precision
+        self.fit_buffer = BoxBuffer()
+        self.fit_buffer.append([0,WHD[0],0,WHD[1],0,0])
+        # state version, bumped whenever the bin changes, and the (version, item signature) that failed in it
+        self.version = 0
+        self.unfit_cache = set()
+        # PackStats of the pack run , None when not profiling
+        self.stats = None
+        # running totals of self.items
+        self._total_weight = 0
+        self._used_volume = 0
+        self._item_count = 0
+        # weight of self.items on each quadrant of the floor , see getGravity
+        self.quadrant_weight = np.zeros(4)
+        # boxes of self.items (same row order) and their index, used to find collisions
+        self.item_boxes = BoxBuffer()
+        self.spatial_index = SpatialGrid(WHD)
+        # extreme points per axis (corner of each item moved along that axis), and their index
+        self.extreme_points = [{}, {}, {}]
+        self.point_index = SpatialGrid(WHD)
         self.unfitted_items = []
         self.number_of_decimals = DEFAULT_NUMBER_OF_DECIMALS
         self.fix_point = False
@@ -108,6 +206,22 @@ class Bin:
         self.gravity = []
 
 
+    @property
+    def fit_items(self):
+        ''' [x0,x1,y0,y1,z0,z1] rows of the floor , the corners and the items put with fix_point (live view) '''
+        return self.fit_buffer.view()
+
+
+    @fit_items.setter
+    def fit_items(self, rows):
+        self.fit_buffer.reset(rows, self.fitDtype())
+
+
+    def fitDtype(self):
+        ''' smallest dtype holding fit_items exactly : float32 for whole numbers , float64 for decimals '''
+        return np.float32 if self.number_of_decimals == 0 else np.float64
+
+
     def formatNumbers(self, number_of_decimals):
         ''' '''
         self.width = set2Decimal(self.width, number_of_decimals)
@@ -115,6 +229,10 @@ class Bin:
         self.depth = set2Decimal(self.depth, number_of_decimals)
         self.max_weight = set2Decimal(self.max_weight, number_of_decimals)
         self.number_of_decimals = number_of_decimals
+        # store the rows with the dtype of the new precision , the floor (first row) takes the rounded size
+        rows = np.array(self.fit_items, dtype=float)
+        rows[0] = [0,float(self.width),0,float(self.height),0,0]
+        self.fit_items = rows
 
 
     def string(self):
@@ -134,21 +252,47 @@ class Bin:
 
     def getTotalWeight(self):
         ''' '''
-        total_weight = 0
+        return set2Decimal(self._total_weight, self.number_of_decimals)
+
+
+    @property
+    def total_weight(self):
+        ''' weight of the items in bin , corners are not counted '''
+        return self._total_weight
+
+
+    @property
+    def used_volume(self):
+        ''' volume of the items in bin , corners are not counted '''
+        return self._used_volume
 
-        for item in self.items:
-            total_weight += item.weight
 
-        return set2Decimal(total_weight, self.number_of_decimals)
+    @property
+    def item_count(self):
+        ''' number of items in bin , corners are not counted '''
+        return self._item_count
 
 
-    def putItem(self, item, pivot,axis=None):
-        ''' put item in bin '''
+    @property
+    def fill_rate(self):
+        ''' used volume (corners not counted) / bin volume '''
+        volume = self.width * self.height * self.depth
+        return float(self._used_volume) / float(volume) if volume else 0.0
+
+
+    def putItem(self, item, pivot,axis=None,rotations=None):
+        ''' put item in bin, only the given rotations are tried if any '''
         fit = False
+        stats = self.stats
         valid_item_position = item.position
         item.position = pivot
-        rotate = RotationType.ALL if item.updown == True else RotationType.Notupdown
-        for i in range(0, len(rotate)):
+        if rotations is not None:
+            rotate = rotations
+        else:
+            rotate = RotationType.ALL if item.updown == True else RotationType.Notupdown
+        for i in rotate:
+            if stats is not None:
+                stats.count('rotations')
             item.rotation_type = i
             dimension = item.getDimension()
             # rotatate
@@ -161,15 +305,23 @@ class Bin:
 
             fit = True
 
-            for current_item_in_bin in self.items:
-                if intersect(current_item_in_bin, item):
+            # only items sharing a grid cell with the candidate can intersect it
+            box = getBox(item)
+            candidates = self.spatial_index.query(box)
+            if candidates:
+                if stats is not None:
+                    stats.count('intersect_calls')
+                if intersectBoxes(self.item_boxes.view()[list(candidates)], box).any():
                     fit = False
-                    break
+                    if stats is not None:
+                        stats.reject('overlap')
 
             if fit:
                 # cal total weight
                 if self.getTotalWeight() + item.weight > self.max_weight:
                     fit = False
+                    if stats is not None:
+                        stats.reject('weight')
                     return fit
                 
                 # fix point float prob
@@ -178,6 +330,8 @@ class Bin:
                     [w,h,d] = dimension
                     [x,y,z] = [float(pivot[0]),float(pivot[1]),float(pivot[2])]
 
+                    if stats is not None:
+                        start = time.perf_counter()
                     for i in range(3):
                         # fix height
                         y = self.checkHeight([x,x+float(w),y,y+float(h),z,z+float(d)])
@@ -185,43 +339,44 @@ class Bin:
                         x = self.checkWidth([x,x+float(w),y,y+float(h),z,z+float(d)])
                         # fix depth
                         z = self.checkDepth([x,x+float(w),y,y+float(h),z,z+float(d)])
+                    if stats is not None:
+                        stats.addTime('snap', time.perf_counter() - start)
 
                     # check stability on item 
                     # rule : 
                     # 1. Define a support ratio, if the ratio below the support surface does not exceed this ratio, compare the second rule.
                     # 2. If there is no support under any vertices of the bottom of the item, then fit = False.
                     if self.check_stable == True :
+                        if stats is not None:
+                            stats.count('stability_checks')
+                            start = time.perf_counter()
                         # Cal the surface area of ​​item.
                         item_area_lower = int(dimension[0] * dimension[1])
-                        # Cal the surface area of ​​the underlying support.
-                        support_area_upper = 0
-                        for i in self.fit_items:
-                            # Verify that the lower support surface area is greater than the upper support surface area * support_surface_ratio.
-                            if z == i[5]  :
-                                area = len(set([ j for j in range(int(x),int(x+int(w)))]) & set([ j for j in range(int(i[0]),int(i[1]))])) * \
-                                len(set([ j for j in range(int(y),int(y+int(h)))]) & set([ j for j in range(int(i[2]),int(i[3]))]))
-                                support_area_upper += area
+                        # Cal the surface area of ​​the underlying support (the boxes whose top is at the bottom of the item).
+                        below = supportingBoxes(self.fit_items, z)
+                        support_area_upper = supportArea(below, x, y, w, h)
 
+                        # Verify that the lower support surface area is greater than the upper support surface area * support_surface_ratio.
                         # If not , get four vertices of the bottom of the item.
                         if support_area_upper / item_area_lower < self.support_surface_ratio :
                             four_vertices = [[x,y],[x+float(w),y],[x,y+float(h)],[x+float(w),y+float(h)]]
                             #  If any vertices is not supported, fit = False.
-                            c = [False,False,False,False]
-                            for i in self.fit_items:
-                                if z == i[5] :
-                                    for jdx,j in enumerate(four_vertices) :
-                                        if (i[0] <= j[0] <= i[1]) and (i[2] <= j[1] <= i[3]) :
-                                            c[jdx] = True
-                            if False in c :
+                            if not verticesSupported(below, four_vertices).all() :
                                 item.position = valid_item_position
                                 fit = False
+                                if stats is not None:
+                                    stats.addTime('stability', time.perf_counter() - start)
+                                    stats.reject('unstable')
                                 return fit
+                        if stats is not None:
+                            stats.addTime('stability', time.perf_counter() - start)
                         
-                    self.fit_items = np.append(self.fit_items,np.array([[x,x+float(w),y,y+float(h),z,z+float(d)]]),axis=0)
+                    self.fit_buffer.append([x,x+float(w),y,y+float(h),z,z+float(d)])
                     item.position = [set2Decimal(x),set2Decimal(y),set2Decimal(z)]
 
                 if fit :
-                    self.items.append(copy.deepcopy(item))
+                    self.items.append(Placement(item, item.position, item.rotation_type))
+                    self.indexItem(item)
 
             else :
                 item.position = valid_item_position
@@ -230,75 +385,131 @@ class Bin:
 
         else :
             item.position = valid_item_position
+            if stats is not None:
+                stats.reject('bounds')
 
         return fit
 
 
+    def getGravity(self):
+        ''' percentage of the total weight on each quadrant of the floor '''
+        total = self.quadrant_weight.sum()
+        # nothing weighs on the bin (e.g. a pack cut by its deadline)
+        if total == 0:
+            return [0, 0, 0, 0]
+        return [round(float(i / total * 100), 2) for i in self.quadrant_weight]
+
+
+    def bumpVersion(self):
+        ''' the bin changed, failures seen so far may not fail any more '''
+        self.version += 1
+        self.unfit_cache.clear()
+
+
+    def fitRotations(self, item):
+        ''' rotations of item that fit in the empty bin '''
+        return [
+            r for r in item.getRotations()
+            if item.dimensions[r][0] <= self.width and item.dimensions[r][1] <= self.height and item.dimensions[r][2] <= self.depth
+        ]
+
+
+    def indexItem(self, item):
+        ''' register the box of the item last appended to self.items '''
+        self.bumpVersion()
+        # corner fittings are part of the bin , not cargo
+        if isinstance(self.items[-1], Placement):
+            self._total_weight += item.weight
+            self._used_volume += item.getVolume()
+            self._item_count += 1
+        box = getBox(item)
+        self.quadrant_weight += quadrantWeights(box, [float(item.weight)], float(self.width), float(self.height))
+        self.item_boxes.append(box)
+        self.spatial_index.insert(len(self.items) - 1, box)
+        self.addExtremePoints(item, box)
+
+
+    def addExtremePoints(self, item, box):
+        ''' add the extreme points of a placed item and drop the points it covers '''
+        # a candidate put on a covered point always intersects the covering item
+        for axis, key in self.point_index.query(box):
+            if key in self.extreme_points[axis] and self.isCovered(key, [box]):
+                del self.extreme_points[axis][key]
+
+        dimension = item.getDimension()
+        for axis in Axis.ALL:
+            pivot = list(item.position)
+            pivot[axis] = pivot[axis] + dimension[axis]
+            key = tuple(pivot)
+            if key in self.extreme_points[axis]:
+                continue
+            # no item fits on a point on or past the far walls of the bin
+            if pivot[0] >= self.width or pivot[1] >= self.height or pivot[2] >= self.depth:
+                continue
+            point = [float(i) for i in pivot]
+            point_box = [point[0], point[0], point[1], point[1], point[2], point[2]]
+            candidates = self.spatial_index.query(point_box)
+            if candidates and self.isCovered(key, self.item_boxes.view()[list(candidates)]):
+                continue
+            self.extreme_points[axis][key] = pivot
+            self.point_index.insert((axis, key), point_box)
+
+
+    def isCovered(self, point, boxes):
+        ''' True if point lies in any of boxes, closed on the near side and open on the far side '''
+        boxes = np.asarray(boxes)
+        p = [float(i) for i in point]
+        return bool((
+            (boxes[:,0] <= p[0]) & (p[0] < boxes[:,1]) &
+            (boxes[:,2] <= p[1]) & (p[1] < boxes[:,3]) &
+            (boxes[:,4] <= p[2]) & (p[2] < boxes[:,5])
+        ).any())
+
+
+    def extremePoints(self):
+        ''' (axis, pivot) in the order of the pivot search : by axis, then by placing order, without duplicates '''
+        seen = set()
+        for axis in Axis.ALL:
+            for key, pivot in list(self.extreme_points[axis].items()):
+                if key not in seen:
+                    seen.add(key)
+                    yield axis, list(pivot)
+
+
     def checkDepth(self,unfix_point):
         ''' fix item position z '''
-        z_ = [[0,0],[float(self.depth),float(self.depth)]]
-        for j in self.fit_items:
-            # creat x set
-            x_bottom = set([i for i in range(int(j[0]),int(j[1]))])
-            x_top = set([i for i in range(int(unfix_point[0]),int(unfix_point[1]))])
-            # creat y set
-            y_bottom = set([i for i in range(int(j[2]),int(j[3]))])
-            y_top = set([i for i in range(int(unfix_point[2]),int(unfix_point[3]))])
-            # find intersection on x set and y set.
-            if len(x_bottom & x_top) != 0 and len(y_bottom & y_top) != 0 :
-                z_.append([float(j[4]),float(j[5])])
-        top_depth = unfix_point[5] - unfix_point[4]
-        # find diff set on z_.
-        z_ = sorted(z_, key = lambda z_ : z_[1])
-        for j in range(len(z_)-1):
-            if z_[j+1][0] -z_[j][1] >= top_depth:
-                return z_[j][1]
-        return unfix_point[4]
+        return self.fixAxis(unfix_point, Axis.DEPTH, float(self.depth))
 
 
     def checkWidth(self,unfix_point):
-        ''' fix item position x ''' 
-        x_ = [[0,0],[float(self.width),float(self.width)]]
-        for j in self.fit_items:
-            # creat z set
-            z_bottom = set([i for i in range(int(j[4]),int(j[5]))])
-            z_top = set([i for i in range(int(unfix_point[4]),int(unfix_point[5]))])
-            # creat y set
-            y_bottom = set([i for i in range(int(j[2]),int(j[3]))])
-            y_top = set([i for i in range(int(unfix_point[2]),int(unfix_point[3]))])
-            # find intersection on z set and y set.
-            if len(z_bottom & z_top) != 0 and len(y_bottom & y_top) != 0 :
-                x_.append([float(j[0]),float(j[1])])
-        top_width = unfix_point[1] - unfix_point[0]
-        # find diff set on x_bottom and x_top.
-        x_ = sorted(x_,key = lambda x_ : x_[1])
-        for j in range(len(x_)-1):
-            if x_[j+1][0] -x_[j][1] >= top_width:
-                return x_[j][1]
-        return unfix_point[0]
-    
+        ''' fix item position x '''
+        return self.fixAxis(unfix_point, Axis.WIDTH, float(self.width))
+
 
     def checkHeight(self,unfix_point):
         '''fix item position y '''
-        y_ = [[0,0],[float(self.height),float(self.height)]]
-        for j in self.fit_items:
-            # creat x set
-            x_bottom = set([i for i in range(int(j[0]),int(j[1]))])
-            x_top = set([i for i in range(int(unfix_point[0]),int(unfix_point[1]))])
-            # creat z set
-            z_bottom = set([i for i in range(int(j[4]),int(j[5]))])
-            z_top = set([i for i in range(int(unfix_point[4]),int(unfix_point[5]))])
-            # find intersection on x set and z set.
-            if len(x_bottom & x_top) != 0 and len(z_bottom & z_top) != 0 :
-                y_.append([float(j[2]),float(j[3])])
-        top_height = unfix_point[3] - unfix_point[2]
-        # find diff set on y_bottom and y_top.
-        y_ = sorted(y_,key = lambda y_ : y_[1])
-        for j in range(len(y_)-1):
-            if y_[j+1][0] -y_[j][1] >= top_height:
-                return y_[j][1]
-
-        return unfix_point[2]
+        return self.fixAxis(unfix_point, Axis.HEIGHT, float(self.height))
+
+
+    def fixAxis(self, unfix_point, axis, limit):
+        ''' move the box on axis to the first gap between the items it overlaps on the two other axes '''
+        rows = self.fit_items
+        # overlap on the integer coordinates covered by each range
+        bound = np.trunc(rows)
+        point = np.trunc(unfix_point)
+        mask = np.ones(len(rows), dtype=bool)
+        for a in Axis.ALL:
+            if a != axis:
+                mask &= np.maximum(bound[:,a*2], point[a*2]) < np.minimum(bound[:,a*2+1], point[a*2+1])
+        # find diff set on the sorted ranges, the bin bottom and top close both ends.
+        st = np.concatenate(([0, limit], rows[mask, axis*2]))
+        ed = np.concatenate(([0, limit], rows[mask, axis*2+1]))
+        order = np.argsort(ed, kind='stable')
+        st, ed = st[order], ed[order]
+        gap = np.flatnonzero(st[1:] - ed[:-1] >= unfix_point[axis*2+1] - unfix_point[axis*2])
+        if len(gap) != 0:
+            return float(ed[gap[0]])
+        return unfix_point[axis*2]
 
 
     def addCorner(self):
@@ -317,6 +528,8 @@ class Bin:
                     loadbear=0, 
                     updown=True, 
                     color='#000000')
+                # with the precision of the bin
+                a.number_of_decimals = self.number_of_decimals
 
                 corner_list.append(a)
             return corner_list
@@ -331,20 +544,42 @@ class Bin:
         pos = [[0,0,0],[0,0,z],[0,y,z],[0,y,0],[x,y,0],[x,0,0],[x,0,z],[x,y,z]]
         item.position = pos[info]
         self.items.append(item)
+        self.indexItem(item)
 
         corner = [float(item.position[0]),float(item.position[0])+float(self.corner),float(item.position[1]),float(item.position[1])+float(self.corner),float(item.position[2]),float(item.position[2])+float(self.corner)]
 
-        self.fit_items = np.append(self.fit_items,np.array([corner]),axis=0)
+        self.fit_buffer.append(corner)
         return
 
 
     def clearBin(self):
         ''' clear item which in bin '''
         self.items = []
-        self.fit_items = np.array([[0,self.width,0,self.height,0,0]])
+        # reuse the buffer , only the floor row is kept
+        self.fit_buffer.reset([[0,self.width,0,self.height,0,0]])
+        self.rebuildIndex()
         return
 
 
+    def rebuildIndex(self):
+        ''' rebuild the boxes, grids and extreme points from self.items '''
+        WHD = (self.width, self.height, self.depth)
+        items = self.items
+        self.items = []
+        self.bumpVersion()
+        self._total_weight = 0
+        self._used_volume = 0
+        self._item_count = 0
+        self.quadrant_weight = np.zeros(4)
+        self.item_boxes = BoxBuffer()
+        self.spatial_index = SpatialGrid(WHD)
+        self.extreme_points = [{}, {}, {}]
+        self.point_index = SpatialGrid(WHD)
+        for item in items:
+            self.items.append(item)
+            self.indexItem(item)
+
+
 class Packer:
 
     def __init__(self):
@@ -354,6 +589,18 @@ class Packer:
         self.unfit_items = []
         self.total_items = 0
         self.binding = []
+        self.order = 'volume'
+        # time.monotonic() after which pack stops searching , and whether it did
+        self.deadline = None
+        self.truncated = False
+        # progress hook called after every item tried , and a token (threading.Event like) stopping pack once set
+        self.callback = None
+        self.cancel = None
+        self.cancelled = False
+        self.started = None
+        self.progress = {'items': 0, 'fitted': 0, 'pivots': 0, 'elapsed': 0.0}
+        # PackStats of the last pack(stats=True)
+        self.stats = None
         # self.apex = []
 
 
@@ -369,9 +616,39 @@ class Packer:
         return self.items.append(item)
 
 
+    def addItems(self, item, count):
+        ''' add count units of the same item, the units share the item and are told apart by their placement records '''
+        self.items.extend([item] * count)
+        self.total_items = len(self.items)
+
+
+    def packItems(self, bin, fix_point, check_stable, support_surface_ratio):
+        ''' pack self.items to bin , once a unit does not fit the following units of the same item are rejected at once '''
+        failed = None
+        for item in self.items:
+            if self.cancel is not None and not self.cancelled and self.cancel.is_set():
+                self.cancelled = self.truncated = True
+            if item is failed or self.timeUp():
+                fitted = False
+                bin.unfitted_items.append(item)
+                if self.stats is not None:
+                    self.stats.reject('stopped' if self.truncated else 'repeat')
+            else:
+                fitted = self.pack2Bin(bin, item, fix_point, check_stable, support_surface_ratio)
+                # the bin did not change , so the next unit can not fit either
+                failed = None if fitted else item
+            if self.callback is not None:
+                self.progress['items'] += 1
+                self.progress['fitted'] += fitted
+                self.progress['elapsed'] = time.monotonic() - self.started
+                self.callback(bin, item, fitted, self.progress)
+
+
     def pack2Bin(self, bin, item,fix_point,check_stable,support_surface_ratio):
-        ''' pack item to bin '''
+        ''' pack item to bin , return whether it fitted '''
         fitted = False
+        if (bin.fix_point, bin.check_stable, bin.support_surface_ratio) != (fix_point, check_stable, support_surface_ratio):
+            bin.bumpVersion()
         bin.fix_point = fix_point
         bin.check_stable = check_stable
         bin.support_surface_ratio = support_surface_ratio
@@ -382,62 +659,79 @@ class Packer:
             for i in range(len(corner_lst)) :
                 bin.putCorner(i,corner_lst[i])
 
-        elif not bin.items:
-            response = bin.putItem(item, item.position)
+        # rotations giving the same dimension or too big for the bin never change the result
+        rotations = bin.fitRotations(item)
+
+        if not bin.items:
+            # the origin , not the position the item was left at by an earlier bin
+            response = bin.putItem(item, list(START_POSITION), rotations=rotations)
 
             if not response:
                 bin.unfitted_items.append(item)
-            return
+            return response
 
-        for axis in range(0, 3):
-            items_in_bin = bin.items
-            for ib in items_in_bin:
-                pivot = [0, 0, 0]
-                w, h, d = ib.getDimension()
-                if axis == Axis.WIDTH:
-                    pivot = [ib.position[0] + w,ib.position[1],ib.position[2]]
-                elif axis == Axis.HEIGHT:
-                    pivot = [ib.position[0],ib.position[1] + h,ib.position[2]]
-                elif axis == Axis.DEPTH:
-                    pivot = [ib.position[0],ib.position[1],ib.position[2] + d]
-                    
-                if bin.putItem(item, pivot, axis):
+        # an item like one that already failed in the same bin state fails the same way
+        key = (bin.version, item.getSignature())
+        if key in bin.unfit_cache:
+            bin.unfitted_items.append(item)
+            if self.stats is not None:
+                self.stats.reject('cached')
+            return False
+        if not rotations and self.stats is not None:
+            self.stats.reject('too_big')
+
+        if rotations:
+            for axis, pivot in bin.extremePoints():
+                if self.timeUp():
+                    break
+                self.progress['pivots'] += 1
+                if bin.putItem(item, pivot, axis, rotations):
                     fitted = True
                     break
-            if fitted:
-                break
         if not fitted:
+            # a search cut by the deadline proves nothing
+            if not self.truncated:
+                bin.unfit_cache.add(key)
             bin.unfitted_items.append(item)
+        return fitted
+
+
+    def phase(self, name):
+        ''' time a phase of pack when profiling '''
+        return nullcontext() if self.stats is None else self.stats.phase(name)
+
+
+    def timeUp(self):
+        ''' the time budget of pack is used up , from then on the result is truncated '''
+        if self.deadline is not None and not self.truncated and time.monotonic() > self.deadline:
+            self.truncated = True
+        return self.truncated
 
 
     def sortBinding(self,bin):
-        ''' sorted by binding '''
-        b,front,back = [],[],[]
-        for i in range(len(self.binding)):
-            b.append([]) 
-            for item in self.items:
-                if item.name in self.binding[i]:
-                    b[i].append(item)
-                elif item.name not in self.binding:
-                    if len(b[0]) == 0 and item not in front:
-                        front.append(item)
-                    elif item not in back and item not in front:
-                        back.append(item)
-
-        min_c = min([len(i) for i in b])
-        
-        sort_bind =[]
-        for i in range(min_c):
-            for j in range(len(b)):
-                sort_bind.append(b[j][i])
-        
-        for i in b:
-            for j in i:
-                if j not in sort_bind:
-                    self.unfit_items.append(j)
+        ''' sorted by binding , the k-th units of all the binding groups make a set , the sets take the place of the first bound unit ,
+        return the units left out (beyond the size of the smallest group) '''
+        # one pass , the group of a unit is looked up by name
+        group_of = {}
+        for i,names in enumerate(self.binding):
+            for name in names:
+                group_of.setdefault(name, i)
+        b,front,back = [[] for _ in self.binding],[],[]
+        rest = front
+        for item in self.items:
+            i = group_of.get(item.name)
+            if i is None:
+                rest.append(item)
+            else:
+                b[i].append(item)
+                rest = back
+
+        min_c = min(len(i) for i in b)
+        sort_bind = [i[k] for k in range(min_c) for i in b]
+        unbound = [item for i in b for item in i[min_c:]]
 
         self.items = front + sort_bind + back
-        return
+        return unbound
 
 
     def putOrder(self):
@@ -463,140 +757,159 @@ class Packer:
         ''' 
         Deviation Of Cargo gravity distribution
         ''' 
-        w = int(bin.width)
-        h = int(bin.height)
-        d = int(bin.depth)
-
-        area1 = [set(range(0,w//2+1)),set(range(0,h//2+1)),0]
-        area2 = [set(range(w//2+1,w+1)),set(range(0,h//2+1)),0]
-        area3 = [set(range(0,w//2+1)),set(range(h//2+1,h+1)),0]
-        area4 = [set(range(w//2+1,w+1)),set(range(h//2+1,h+1)),0]
-        area = [area1,area2,area3,area4]
-
-        for i in bin.items:
-
-            x_st = int(i.position[0])
-            y_st = int(i.position[1])
-            if i.rotation_type == 0:
-                x_ed = int(i.position[0] + i.width)
-                y_ed = int(i.position[1] + i.height)
-            elif i.rotation_type == 1:
-                x_ed = int(i.position[0] + i.height)
-                y_ed = int(i.position[1] + i.width)
-            elif i.rotation_type == 2:
-                x_ed = int(i.position[0] + i.height)
-                y_ed = int(i.position[1] + i.depth)
-            elif i.rotation_type == 3:
-                x_ed = int(i.position[0] + i.depth)
-                y_ed = int(i.position[1] + i.height)
-            elif i.rotation_type == 4:
-                x_ed = int(i.position[0] + i.depth)
-                y_ed = int(i.position[1] + i.width)
-            elif i.rotation_type == 5:
-                x_ed = int(i.position[0] + i.width)
-                y_ed = int(i.position[1] + i.depth)
-
-            x_set = set(range(x_st,int(x_ed)+1))
-            y_set = set(range(y_st,y_ed+1))
-
-            # cal gravity distribution
-            for j in range(len(area)):
-                if x_set.issubset(area[j][0]) and y_set.issubset(area[j][1]) : 
-                    area[j][2] += int(i.weight)
-                    break
-                # include x and !include y
-                elif x_set.issubset(area[j][0]) == True and y_set.issubset(area[j][1]) == False and len(y_set & area[j][1]) != 0 : 
-                    y = len(y_set & area[j][1]) / (y_ed - y_st) * int(i.weight)
-                    area[j][2] += y
-                    if j >= 2 :
-                        area[j-2][2] += (int(i.weight) - x)
-                    else :
-                        area[j+2][2] += (int(i.weight) - y)
-                    break
-                # include y and !include x
-                elif x_set.issubset(area[j][0]) == False and y_set.issubset(area[j][1]) == True and len(x_set & area[j][0]) != 0 : 
-                    x = len(x_set & area[j][0]) / (x_ed - x_st) * int(i.weight)
-                    area[j][2] += x
-                    if j >= 2 :
-                        area[j-2][2] += (int(i.weight) - x)
-                    else :
-                        area[j+2][2] += (int(i.weight) - x)
-                    break
-                # !include x and !include y
-                elif x_set.issubset(area[j][0])== False and y_set.issubset(area[j][1]) == False and len(y_set & area[j][1]) != 0  and len(x_set & area[j][0]) != 0 :
-                    all = (y_ed - y_st) * (x_ed - x_st)
-                    y = len(y_set & area[0][1])
-                    y_2 = y_ed - y_st - y
-                    x = len(x_set & area[0][0])
-                    x_2 = x_ed - x_st - x
-                    area[0][2] += x * y / all * int(i.weight)
-                    area[1][2] += x_2 * y / all * int(i.weight)
-                    area[2][2] += x * y_2 / all * int(i.weight)
-                    area[3][2] += x_2 * y_2 / all * int(i.weight)
-                    break
-            
-        r = [area[0][2],area[1][2],area[2][2],area[3][2]]
-        result = []
-        for i in r :
-            result.append(round(i / sum(r) * 100,2))
-        return result
+        # the weight of every item is split over the quadrants by its footprint area , kept up to date by the bin
+        return bin.getGravity()
 
 
-    def pack(self, bigger_first=False,distribute_items=True,fix_point=True,check_stable=True,support_surface_ratio=0.75,binding=[],number_of_decimals=DEFAULT_NUMBER_OF_DECIMALS):
-        '''pack master func '''
-        # set decimals
+    def sortItems(self, order, bigger_first):
+        ''' sorted by order -> sorted by loadbear -> sorted by level '''
+        if isinstance(order, int):
+            random.Random(order).shuffle(self.items)
+        else:
+            self.items.sort(key=ITEM_ORDERS[order], reverse=bigger_first)
+        self.items.sort(key=lambda item: item.loadbear, reverse=True)
+        self.items.sort(key=lambda item: item.level, reverse=False)
+
+
+    def packParallel(self, workers, kwargs, portfolio=None):
+        ''' pack on worker processes : each order of portfolio in its own process keeping the best layout ,
+        or without portfolio each bin in its own process (every bin gets all the items) '''
+        from .parallel import packBins, packPortfolio
+
         for bin in self.bins:
-            bin.formatNumbers(number_of_decimals)
+            bin.formatNumbers(kwargs['number_of_decimals'])
+        for item in self.items:
+            item.formatNumbers(kwargs['number_of_decimals'])
+        self.binding = kwargs['binding']
+        self.bins.sort(key=lambda bin: bin.getVolume(), reverse=kwargs['bigger_first'])
+
+        if portfolio:
+            self.unfit_items, self.order, self.truncated = packPortfolio(self, portfolio, kwargs, workers)
+        else:
+            self.unfit_items, self.truncated = packBins(self, kwargs, workers)
+        self.items = []
 
+
+    def selectBin(self, bins, workers=None, **kwargs):
+        ''' pack the items in the smallest of bins holding all of them , candidates are packed on worker processes ,
+        kwargs are passed to pack . return the bin (also the only bin of the packer) or None if no bin holds all items ,
+        self.truncated is set when no bin was found and a candidate was cut by the deadline '''
+        from .parallel import selectBin
+
+        if kwargs.get('callback') is not None or kwargs.get('cancel') is not None:
+            raise ValueError("callback and cancel can not be used with worker processes")
+        number_of_decimals = kwargs.get('number_of_decimals', DEFAULT_NUMBER_OF_DECIMALS)
+        for bin in bins:
+            bin.formatNumbers(number_of_decimals)
         for item in self.items:
             item.formatNumbers(number_of_decimals)
+        kwargs['distribute_items'] = True
+
+        bin, self.truncated = selectBin(self, bins, kwargs, workers)
+        if bin is not None:
+            self.binding = kwargs.get('binding', [])
+            self.unfit_items = []
+            self.items = []
+        return bin
+
+
+    def pack(self, bigger_first=False,distribute_items=True,fix_point=True,check_stable=True,support_surface_ratio=0.75,binding=[],number_of_decimals=DEFAULT_NUMBER_OF_DECIMALS,workers=None,order='volume',portfolio=None,deadline=None,time_budget_s=None,callback=None,cancel=None,stats=False):
+        '''pack master func , workers : number of processes packing the bins side by side when distribute_items=False ,
+        order : sort key of the items ('volume', 'area', 'edge', 'weight' or an int seed to shuffle) ,
+        portfolio : orders to try on worker processes (True for DEFAULT_PORTFOLIO) , the layout with the most fitted items then the best fill is kept ,
+        deadline / time_budget_s : time.monotonic() / seconds from now after which the items left are unfitted and self.truncated is set ,
+        callback : called as callback(bin, item, fitted, progress) after every item tried , progress counts items , fitted , pivots and elapsed seconds ,
+        cancel : object with is_set() (e.g. threading.Event) checked between items , once set the items left are unfitted and self.cancelled is set ,
+        stats : count pivots , rotations , intersect calls , stability checks and rejections and time every phase and bin in self.stats (PackStats) '''
+        if portfolio is True:
+            portfolio = DEFAULT_PORTFOLIO
+        for i in [order] + list(portfolio or []):
+            if not isinstance(i, int) and i not in ITEM_ORDERS:
+                raise ValueError("order must be one of %s or an int seed" % list(ITEM_ORDERS))
+        if time_budget_s is not None:
+            deadline = min(time.monotonic() + time_budget_s, deadline if deadline is not None else float('inf'))
+        self.deadline = deadline
+        self.truncated = False
+        self.callback = callback
+        self.cancel = cancel
+        self.cancelled = False
+        self.started = time.monotonic()
+        self.progress = {'items': 0, 'fitted': 0, 'pivots': 0, 'elapsed': 0.0}
+        self.stats = PackStats() if stats else None
+        for bin in self.bins:
+            bin.stats = self.stats
+        if (portfolio or workers and not distribute_items and len(self.bins) > 1) and (callback is not None or cancel is not None):
+            raise ValueError("callback and cancel can not be used with worker processes")
+        kwargs = dict(
+            bigger_first=bigger_first, distribute_items=distribute_items, fix_point=fix_point, check_stable=check_stable,
+            support_surface_ratio=support_surface_ratio, binding=binding, number_of_decimals=number_of_decimals,
+            order=order, deadline=deadline, stats=stats
+        )
+        if portfolio:
+            self.packParallel(workers, kwargs, portfolio)
+            return
+        if workers and not distribute_items and len(self.bins) > 1:
+            self.packParallel(workers, kwargs)
+            return
+        self.order = order
+        with self.phase('format'):
+            # set decimals
+            for bin in self.bins:
+                bin.formatNumbers(number_of_decimals)
+
+            for item in self.items:
+                item.formatNumbers(number_of_decimals)
         # add binding attribute
         self.binding = binding
-        # Bin : sorted by volumn
-        self.bins.sort(key=lambda bin: bin.getVolume(), reverse=bigger_first)
-        # Item : sorted by volumn -> sorted by loadbear -> sorted by level -> binding
-        self.items.sort(key=lambda item: item.getVolume(), reverse=bigger_first)
-        # self.items.sort(key=lambda item: item.getMaxArea(), reverse=bigger_first)
-        self.items.sort(key=lambda item: item.loadbear, reverse=True)
-        self.items.sort(key=lambda item: item.level, reverse=False)
+        with self.phase('sort'):
+            # Bin : sorted by volumn
+            self.bins.sort(key=lambda bin: bin.getVolume(), reverse=bigger_first)
+            # Item : sorted by order (volumn) -> sorted by loadbear -> sorted by level -> binding
+            self.sortItems(order, bigger_first)
         # sorted by binding
+        unbound = []
         if binding != []:
-            self.sortBinding(bin)
+            with self.phase('binding'):
+                unbound = self.sortBinding(bin)
+                # the sort keys come first , the binding order breaks their ties
+                self.sortItems(order, bigger_first)
 
         for idx,bin in enumerate(self.bins):
+            started = time.perf_counter()
+            # units left out of the binding sets can not go in any bin
+            bin.unfitted_items.extend(unbound)
             # pack item to bin
-            for item in self.items:
-                self.pack2Bin(bin, item, fix_point, check_stable, support_surface_ratio)
-
-            if binding != []:
-                # resorted
-                self.items.sort(key=lambda item: item.getVolume(), reverse=bigger_first)
-                self.items.sort(key=lambda item: item.loadbear, reverse=True)
-                self.items.sort(key=lambda item: item.level, reverse=False)
-                # clear bin
-                bin.items = []
-                bin.unfitted_items = self.unfit_items
-                bin.fit_items = np.array([[0,bin.width,0,bin.height,0,0]])
-                # repacking
-                for item in self.items:
-                    self.pack2Bin(bin, item,fix_point,check_stable,support_surface_ratio)
-            
-            # Deviation Of Cargo Gravity Center 
-            self.bins[idx].gravity = self.gravityCenter(bin)
+            with self.phase('place'):
+                self.packItems(bin, fix_point, check_stable, support_surface_ratio)
+
+            # Deviation Of Cargo Gravity Center
+            with self.phase('gravity'):
+                self.bins[idx].gravity = self.gravityCenter(bin)
 
             if distribute_items :
-                for bitem in bin.items:
-                    no = bitem.partno
-                    for item in self.items :
-                        if item.partno == no :
-                            self.items.remove(item)
-                            break
+                with self.phase('distribute'):
+                    # every placed record takes out the first unit left with its partno , in one pass
+                    placed = Counter(bitem.partno for bitem in bin.items)
+                    items = []
+                    for item in self.items:
+                        if placed[item.partno] > 0:
+                            placed[item.partno] -= 1
+                        else:
+                            items.append(item)
+                    self.items = items
+
+            if self.stats is not None:
+                self.stats.addBinTime(bin.partno, time.perf_counter() - started)
 
         # put order of items
-        self.putOrder()
-
-        if self.items != []:
-            self.unfit_items = copy.deepcopy(self.items)
+        with self.phase('order'):
+            self.putOrder()
+        if self.stats is not None:
+            self.stats.count('pivots', self.progress['pivots'])
+
+        if self.items != [] or unbound:
+            # units left out of the binding sets are never packed
+            self.unfit_items = unbound + list(self.items)
             self.items = []
         # for item in self.items.copy():
         #     if item in bin.unfitted_items:
@@ -0,0 +1,124 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from .main import Packer, Placement
+import os
+
+
+
+def packOne(bins, items, kwargs):
+    ''' pack items to bins in a fresh packer (runs in a worker process) '''
+    packer = Packer()
+    for bin in bins:
+        packer.addBin(bin)
+    packer.items = list(items)
+    packer.pack(**kwargs)
+    # items is sent back so the records and the items keep pointing to the same objects
+    return packer.bins, items, packer.unfit_items, packer.truncated, packer.stats
+
+
+def mergeBin(bin, packed, remap):
+    ''' copy the state of a bin packed in a worker to bin , records point to the items of this process '''
+    for name in type(bin).__slots__:
+        setattr(bin, name, getattr(packed, name))
+    # corner items are made by the bin itself and kept as they are
+    bin.items = [
+        Placement(remap[id(item.item)], item.position, item.rotation_type) if isinstance(item, Placement) else item
+        for item in bin.items
+    ]
+    bin.unfitted_items = [remap.get(id(item), item) for item in bin.unfitted_items]
+
+
+def mergeResult(packer, result, items):
+    ''' put a worker result in packer , items is the list that was sent to the worker '''
+    bins, sent, unfit_items, truncated, stats = result
+    remap = {id(copy): item for copy, item in zip(sent, items)}
+    for bin, packed in zip(packer.bins, bins):
+        mergeBin(bin, packed, remap)
+        bin.stats = packer.stats
+    return [remap[id(item)] for item in unfit_items]
+
+
+def addStats(packer, results):
+    ''' the numbers of all the worker runs add up in packer.stats '''
+    if packer.stats is not None:
+        for result in results:
+            packer.stats.merge(result[4])
+
+
+def packBins(packer, kwargs, workers):
+    ''' pack every bin of packer on its own process , each bin gets all the items (distribute_items=False) '''
+    items = packer.items
+    with ProcessPoolExecutor(max_workers=min(workers, len(packer.bins))) as pool:
+        futures = [pool.submit(packOne, [bin], items, kwargs) for bin in packer.bins]
+        results = [future.result() for future in futures]
+
+    addStats(packer, results)
+    unfit_items = []
+    bins = packer.bins
+    for bin, result in zip(bins, results):
+        packer.bins = [bin]
+        unfit_items = mergeResult(packer, result, items)
+    packer.bins = bins
+    return unfit_items, any(result[3] for result in results)
+
+
+def score(bins):
+    ''' number of fitted items , then used volume '''
+    fitted = sum(isinstance(item, Placement) for bin in bins for item in bin.items)
+    return fitted, sum(float(bin.used_volume) for bin in bins)
+
+
+def packPortfolio(packer, orders, kwargs, workers):
+    ''' pack packer once per item order on worker processes and keep the best layout , the first order wins ties '''
+    items = packer.items
+    workers = min(workers or os.cpu_count() or 1, len(orders))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(packOne, packer.bins, items, dict(kwargs, order=order)) for order in orders]
+        results = [future.result() for future in futures]
+
+    addStats(packer, results)
+    best = max(range(len(orders)), key=lambda i: score(results[i][0]))
+    return mergeResult(packer, results[best], items), orders[best], results[best][3]
+
+
+def canHold(bin, items):
+    ''' cheap bounds : total volume , total weight and every item fitting the empty bin '''
+    if sum(item.getVolume() for item in items) > bin.getVolume():
+        return False
+    if sum(item.weight for item in items) > bin.max_weight:
+        return False
+    return all(bin.fitRotations(item) for item in items)
+
+
+def selectBin(packer, bins, kwargs, workers):
+    ''' pack packer's items in the candidate bins from the smallest volume up ,
+    return the first bin holding all of them (or None) and whether a candidate was cut by the deadline '''
+    items = packer.items
+    candidates = [bin for bin in sorted(bins, key=lambda bin: bin.getVolume()) if canHold(bin, items)]
+    if not candidates:
+        return None, False
+
+    found, truncated = None, False
+    with Manager() as manager:
+        # set once a bin is found , the larger candidates still running stop at their next item
+        stop = manager.Event()
+        pool = ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(candidates)))
+        try:
+            futures = [pool.submit(packOne, [bin], items, dict(kwargs, cancel=stop)) for bin in candidates]
+            # bins are checked in volume order , a larger bin is only used if every smaller one failed
+            for bin, future in zip(candidates, futures):
+                result = future.result()
+                truncated = truncated or result[3]
+                if not result[2] and not result[0][0].unfitted_items:
+                    found = bin, result
+                    break
+        finally:
+            stop.set()
+            pool.shutdown(cancel_futures=True)
+    if found is None:
+        return None, truncated
+
+    bin, result = found
+    packer.bins = [bin]
+    mergeResult(packer, result, items)
+    return bin, False
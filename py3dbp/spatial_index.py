@@ -0,0 +1,88 @@
+import math
+import numpy as np
+# number of cells along each axis of the bin
+DEFAULT_GRID_CELLS = 8
+
+
+
+class SpatialGrid:
+
+    def __init__(self, WHD, cells=DEFAULT_GRID_CELLS):
+        ''' uniform 3D grid over a bin, each cell keeps the indices of the boxes touching it '''
+        self.cells = cells
+        self.cell_size = [max(float(i), 1e-9) / cells for i in WHD]
+        self.grid = {}
+
+
+    def cellRange(self, box, axis):
+        ''' first and last cell covered by box on axis '''
+        size = self.cell_size[axis]
+        last = self.cells - 1
+        st = min(max(math.floor(box[axis*2] / size), 0), last)
+        ed = min(max(math.floor(box[axis*2+1] / size), 0), last)
+        return st, ed
+
+
+    def cellKeys(self, box):
+        ''' all cells covered by box '''
+        x_st, x_ed = self.cellRange(box, 0)
+        y_st, y_ed = self.cellRange(box, 1)
+        z_st, z_ed = self.cellRange(box, 2)
+        return [
+            (i, j, k)
+            for i in range(x_st, x_ed + 1)
+            for j in range(y_st, y_ed + 1)
+            for k in range(z_st, z_ed + 1)
+        ]
+
+
+    def insert(self, index, box):
+        ''' register box [x0,x1,y0,y1,z0,z1] under index '''
+        for key in self.cellKeys(box):
+            self.grid.setdefault(key, []).append(index)
+
+
+    def query(self, box):
+        ''' indices of the boxes sharing at least one cell with box '''
+        candidates = set()
+        for key in self.cellKeys(box):
+            candidates.update(self.grid.get(key, ()))
+        return candidates
+
+
+class BoxBuffer:
+
+    def __init__(self, capacity=16, dtype=float):
+        ''' growable matrix of [x0,x1,y0,y1,z0,z1] rows '''
+        self.data = np.empty((capacity, 6), dtype=dtype)
+        self.size = 0
+
+
+    def append(self, box):
+        ''' add one row, doubling the capacity when full '''
+        if self.size == len(self.data):
+            data = np.empty((len(self.data) * 2, 6), dtype=self.data.dtype)
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+        self.data[self.size] = box
+        self.size += 1
+
+
+    def reset(self, rows, dtype=None):
+        ''' replace the rows , stored as dtype (default the current one) , the memory is kept when it fits '''
+        rows = np.asarray(rows).reshape(-1, 6)
+        dtype = np.dtype(dtype or self.data.dtype)
+        if dtype.kind in 'iu':
+            rows = np.rint(rows)
+        if dtype != self.data.dtype or len(rows) > len(self.data):
+            data = np.empty((max(len(rows), len(self.data)), 6), dtype=dtype)
+        else:
+            data = self.data
+        data[:len(rows)] = rows
+        self.data = data
+        self.size = len(rows)
+
+
+    def view(self):
+        ''' live rows '''
+        return self.data[:self.size]
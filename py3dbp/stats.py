@@ -0,0 +1,75 @@
+from collections import Counter
+from contextlib import contextmanager
+import time
+
+
+
+class PackStats:
+
+    def __init__(self):
+        ''' counters and wall time per phase of pack runs (pack(stats=True)) '''
+        # pivots , rotations , intersect_calls , stability_checks
+        self.counters = Counter()
+        # why a pivot (bounds , overlap , weight , unstable) or an item (too_big , cached , repeat , stopped) was rejected
+        self.rejections = Counter()
+        # seconds per phase , place includes snap and stability
+        self.phases = Counter()
+        # seconds per bin (partno) , placing , gravity and distribution
+        self.bins = Counter()
+
+
+    def count(self, name, n=1):
+        ''' '''
+        self.counters[name] += n
+
+
+    def reject(self, reason):
+        ''' '''
+        self.rejections[reason] += 1
+
+
+    def addTime(self, name, seconds):
+        ''' '''
+        self.phases[name] += seconds
+
+
+    def addBinTime(self, partno, seconds):
+        ''' '''
+        self.bins[partno] += seconds
+
+
+    @contextmanager
+    def phase(self, name):
+        ''' time the block as phase name '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+
+    def merge(self, other):
+        ''' add the numbers of other (e.g. from a worker process) '''
+        self.counters.update(other.counters)
+        self.rejections.update(other.rejections)
+        self.phases.update(other.phases)
+        self.bins.update(other.bins)
+
+
+    def asDict(self):
+        ''' plain dict of all the numbers '''
+        return {
+            'counters': dict(self.counters),
+            'rejections': dict(self.rejections),
+            'phases': dict(self.phases),
+            'bins': dict(self.bins),
+        }
+
+
+    def string(self):
+        ''' '''
+        return "counters(%s) rejections(%s) phases(%s) bins(%s)" % (
+            dict(self.counters), dict(self.rejections),
+            {k: round(v, 4) for k, v in self.phases.items()},
+            {k: round(v, 4) for k, v in self.bins.items()}
+        )
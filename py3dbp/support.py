@@ -0,0 +1,32 @@
+import numpy as np
+
+
+
+def supportingBoxes(boxes, z):
+    ''' rows of boxes ([x0,x1,y0,y1,z0,z1] matrix like Bin.fit_items) whose top is at height z '''
+    return boxes[boxes[:,5] == z]
+
+
+def supportArea(boxes, x, y, w, h):
+    ''' area of the footprint (x, y, w, h) resting on boxes , summed box by box ,
+    counted on whole units like the set(range()) overlap it replaces '''
+    if len(boxes) == 0:
+        return 0
+    x_st, x_ed = int(x), int(x + int(w))
+    y_st, y_ed = int(y), int(y + int(h))
+    b = np.trunc(boxes[:,:4])
+    dx = np.clip(np.minimum(x_ed, b[:,1]) - np.maximum(x_st, b[:,0]), 0, None)
+    dy = np.clip(np.minimum(y_ed, b[:,3]) - np.maximum(y_st, b[:,2]), 0, None)
+    return int((dx * dy).sum())
+
+
+def verticesSupported(boxes, vertices):
+    ''' mask over vertices ([x,y] points) , True if the point lies on (or on the edge of) one of boxes '''
+    if len(boxes) == 0:
+        return np.zeros(len(vertices), dtype=bool)
+    v = np.asarray(vertices, dtype=float)
+    inside = (
+        (boxes[:,0] <= v[:,0:1]) & (v[:,0:1] <= boxes[:,1]) &
+        (boxes[:,2] <= v[:,1:2]) & (v[:,1:2] <= boxes[:,3])
+    )
+    return inside.any(axis=1)